@@ -9,7 +9,7 @@ from types import FrameType, CodeType, TracebackType
 from typing import (
     Iterator, List, Tuple, Optional, NamedTuple,
     Any, Iterable, Callable, Union,
-    Sequence)
+    Sequence, Dict)
 from typing import Mapping
 
 import executing
@@ -177,6 +177,25 @@ class Source(executing.Source):
     def line_range(self, node: ast.AST) -> Tuple[int, int]:
         return line_range(self.asttext(), node)
 
+    def scope_pieces(self, scope: ast.AST) -> List[range]:
+        """
+        The pieces contained in the given scope node.
+        Cached per node since every frame executing the same code shares its scope.
+        """
+        cache = self._scope_pieces_cache
+        if scope not in cache:
+            scope_start, scope_end = self.line_range(scope)
+            cache[scope] = [
+                piece
+                for piece in self.pieces
+                if scope_start <= piece.start and piece.stop <= scope_end
+            ]
+        return cache[scope]
+
+    @cached_property
+    def _scope_pieces_cache(self) -> Dict[ast.AST, List[range]]:
+        return {}
+
 
 class Options:
     """
@@ -235,6 +254,8 @@ class BlankLineRange:
     Records the line number range for blank lines gaps between pieces.
     For a single blank line, begin_lineno == end_lineno.
     """
+    __slots__ = ("begin_lineno", "end_lineno")
+
     def __init__(self, begin_lineno: int, end_lineno: int):
         self.begin_lineno = begin_lineno
         self.end_lineno = end_lineno
@@ -581,7 +602,7 @@ class FrameInfo(object):
         # as the order from a traceback, which is the order of a printed
         # traceback when read top to bottom (most recent call last)
         if is_frame(frame_or_tb):
-            stack = stack[::-1]
+            stack.reverse()
 
         def mapper(f):
             return cls(f, options)
@@ -611,12 +632,7 @@ class FrameInfo(object):
         if not self.scope:
             return self.source.pieces
 
-        scope_start, scope_end = self.source.line_range(self.scope)
-        return [
-            piece
-            for piece in self.source.pieces
-            if scope_start <= piece.start and piece.stop <= scope_end
-        ]
+        return self.source.scope_pieces(self.scope)
 
     @cached_property
     def filename(self) -> str:
@@ -1,12 +1,19 @@
 import inspect
 import sys
 import traceback
+from operator import attrgetter
 from types import FrameType, TracebackType
 from typing import Union, Iterable
 
 from stack_data import (style_with_executing_node, Options, Line, FrameInfo, LINE_GAP,
                        Variable, RepeatedFrames, BlankLineRange, BlankLines)
-from stack_data.utils import assert_
+from stack_data.utils import assert_, truncated_repr
+
+_VAR_NAME = attrgetter("name")
+_CAUSE_MSG = traceback._cause_message
+_CONTEXT_MSG = traceback._context_message
+_HEADER_FMT = ' File "{}", line {}, in {}\n'.format
+_WRITE_BATCH_SIZE = 64
 
 
 class Formatter:
@@ -57,7 +64,7 @@ class Formatter:
             ValueError("executing_node_underline must be a single character"),
         )
         self.executing_node_underline = executing_node_underline
-        self.current_line_indicator = current_line_indicator or ""
+        self.current_line_indicator = current_line_indicator
         self.line_gap_string = line_gap_string
         self.line_number_gap_string = line_number_gap_string
         self.line_number_format_string = line_number_format_string
@@ -74,6 +81,29 @@ class Formatter:
                 "BlankLines.SINGLE option can only be used when show_linenos=True"
             )
 
+    @property
+    def current_line_indicator(self) -> str:
+        return self._current_line_indicator
+
+    @current_line_indicator.setter
+    def current_line_indicator(self, value):
+        # Line prefixes are derived here rather than in every call to format_line
+        self._current_line_indicator = value or ""
+        if self._current_line_indicator:
+            self._current_line_prefix = self._current_line_indicator + " "
+            self._line_prefix = " " * len(self._current_line_indicator) + " "
+        else:
+            self._current_line_prefix = self._line_prefix = "   "
+
+    @property
+    def line_number_format_string(self) -> str:
+        return self._line_number_format_string
+
+    @line_number_format_string.setter
+    def line_number_format_string(self, value):
+        self._line_number_format_string = value
+        self._format_line_number = value.format
+
     def set_hook(self):
         def excepthook(_etype, evalue, _tb):
             self.print_exception(evalue)
@@ -92,25 +122,57 @@ class Formatter:
     def print_lines(self, lines, *, file=None):
         if file is None:
             file = sys.stderr
-        for line in lines:
-            print(line, file=file, end="")
+        # Like print(), fall back to stdout and do nothing if that's missing too,
+        # e.g. under pythonw
+        if file is None:
+            file = sys.stdout
+        if file is None:
+            return
+
+        # Only write is required of file, like print().
+        # Join fragments into batches to make fewer calls,
+        # while still writing everything formatted before any error.
+        write = file.write
+        batch = []
+        try:
+            for line in lines:
+                batch.append(line)
+                if len(batch) >= _WRITE_BATCH_SIZE:
+                    write("".join(batch))
+                    batch.clear()
+        finally:
+            if batch:
+                write("".join(batch))
 
     def format_exception(self, e=None) -> Iterable[str]:
         if e is None:
             e = sys.exc_info()[1]
 
+        # Walk the chain iteratively, pairing each earlier exception
+        # with the message that links it to the one after it.
+        # Guard against cycles like the traceback module does.
+        chain = [(e, None)]
         if self.chain:
-            if e.__cause__ is not None:
-                yield from self.format_exception(e.__cause__)
-                yield traceback._cause_message
-            elif (e.__context__ is not None
-                  and not e.__suppress_context__):
-                yield from self.format_exception(e.__context__)
-                yield traceback._context_message
-
-        yield 'Traceback (most recent call last):\n'
-        yield from self.format_stack(e.__traceback__)
-        yield from traceback.format_exception_only(type(e), e)
+            seen = {id(e)}
+            while True:
+                if e.__cause__ is not None:
+                    e, message = e.__cause__, _CAUSE_MSG
+                elif (e.__context__ is not None
+                      and not e.__suppress_context__):
+                    e, message = e.__context__, _CONTEXT_MSG
+                else:
+                    break
+                if id(e) in seen:
+                    break
+                seen.add(id(e))
+                chain.append((e, message))
+
+        for e, message in reversed(chain):
+            yield 'Traceback (most recent call last):\n'
+            yield from self.format_stack(e.__traceback__)
+            yield from traceback.format_exception_only(type(e), e)
+            if message:
+                yield message
 
     def format_stack(self, frame_or_tb=None) -> Iterable[str]:
         if frame_or_tb is None:
@@ -160,65 +222,63 @@ class Formatter:
                 pass
 
     def format_frame_header(self, frame_info: FrameInfo) -> str:
-        return ' File "{frame_info.filename}", line {frame_info.lineno}, in {name}\n'.format(
-            frame_info=frame_info,
-            name=(
-                frame_info.executing.code_qualname()
-                if self.use_code_qualname else
-                frame_info.code.co_name
-            ),
-        )
+        if self.use_code_qualname:
+            name = frame_info.executing.code_qualname()
+        else:
+            name = frame_info.code.co_name
+        return _HEADER_FMT(frame_info.filename, frame_info.lineno, name)
 
     def format_line(self, line: Line) -> str:
-        result = ""
-        if self.current_line_indicator:
-            if line.is_current:
-                result = self.current_line_indicator
-            else:
-                result = " " * len(self.current_line_indicator)
-            result += " "
+        if line.is_current:
+            prefix = self._current_line_prefix
         else:
-            result = "   "
+            prefix = self._line_prefix
 
         if self.show_linenos:
-            result += self.line_number_format_string.format(line.lineno)
-
-        prefix = result
-
-        result += line.render(
-            pygmented=self.pygmented,
-            escape_html=self.html,
-            strip_leading_indent=self.strip_leading_indent,
-        ) + "\n"
+            prefix += self._format_line_number(line.lineno)
+
+        parts = [
+            prefix,
+            line.render(
+                pygmented=self.pygmented,
+                escape_html=self.html,
+                strip_leading_indent=self.strip_leading_indent,
+            ),
+            "\n",
+        ]
 
         if self.show_executing_node and not self.pygmented:
-            for line_range in line.executing_node_ranges:
-                start = line_range.start - line.leading_indent
-                end = line_range.end - line.leading_indent
-                # if end <= start, we have an empty line inside a highlighted
-                # block of code. In this case, we need to avoid inserting
-                # an extra blank line with no markers present.
-                if end > start:
-                    result += (
-                            " " * (start + len(prefix))
-                            + self.executing_node_underline * (end - start)
-                            + "\n"
-                    )
-        return result
+            ranges = line.executing_node_ranges
+            if ranges:
+                leading_indent = line.leading_indent
+                prefix_len = len(prefix)
+                underline = self.executing_node_underline
+                for line_range in ranges:
+                    start = line_range.start - leading_indent
+                    end = line_range.end - leading_indent
+                    # if end <= start, we have an empty line inside a highlighted
+                    # block of code. In this case, we need to avoid inserting
+                    # an extra blank line with no markers present.
+                    if end > start:
+                        parts.append(" " * (start + prefix_len))
+                        parts.append(underline * (end - start))
+                        parts.append("\n")
+        return "".join(parts)
 
 
     def format_blank_lines_linenumbers(self, blank_line):
-        if self.current_line_indicator:
-            result = " " * len(self.current_line_indicator) + " "
-        else:
-            result = "   "
+        result = self._line_prefix
         if blank_line.begin_lineno == blank_line.end_lineno:
-            return result + self.line_number_format_string.format(blank_line.begin_lineno) + "\n"
+            return result + self._format_line_number(blank_line.begin_lineno) + "\n"
         return result + "   {}\n".format(self.line_number_gap_string)
 
 
     def format_variables(self, frame_info: FrameInfo) -> Iterable[str]:
-        for var in sorted(frame_info.variables, key=lambda v: v.name):
+        variables = frame_info.variables
+        if len(variables) > 1:
+            # Not sorted in place, frame_info.variables is cached
+            variables = sorted(variables, key=_VAR_NAME)
+        for var in variables:
             try:
                 yield self.format_variable(var) + "\n"
             except Exception:
@@ -231,4 +291,4 @@ class Formatter:
         )
 
     def format_variable_value(self, value) -> str:
-        return repr(value)
+        return truncated_repr(value)
@@ -1,7 +1,9 @@
 import ast
 import itertools
+import reprlib
 import types
 from collections import OrderedDict, Counter, defaultdict
+from operator import itemgetter
 from types import FrameType, TracebackType
 from typing import (
     Iterator, List, Tuple, Iterable, Callable, Union,
@@ -18,10 +20,88 @@ def truncate(seq, max_length: int, middle):
     if len(seq) > max_length:
         right = (max_length - len(middle)) // 2
         left = max_length - len(middle) - right
-        seq = seq[:left] + middle + seq[-right:]
+        result = seq[:left]
+        result += middle
+        # Not seq[-right:], which would be the whole sequence when right == 0
+        result += seq[len(seq) - right:]
+        seq = result
     return seq
 
 
+class _VariableRepr(reprlib.Repr):
+    """
+    A reprlib.Repr that only limits sizes.
+    Unlike the base class it keeps dicts and sets in iteration order.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.maxstring = self.maxother = self.maxlong = 200
+        self.maxtuple = self.maxlist = self.maxarray = self.maxdeque = 10
+        self.maxdict = self.maxset = self.maxfrozenset = 10
+        self.maxlevel = 20
+        # Bounds the total work and output, since the limits above are per container
+        self.maxvalues = 100
+        self._remaining_values = self.maxvalues
+
+    def repr1(self, x, level):
+        self._remaining_values -= 1
+        return super().repr1(x, level)
+
+    def _pieces(self, items, n, maxiter, piece_repr):
+        pieces = []
+        for item in itertools.islice(items, maxiter):
+            if self._remaining_values <= 0:
+                break
+            pieces.append(piece_repr(item))
+        if len(pieces) < n:
+            pieces.append('...')
+        return pieces
+
+    def _repr_iterable(self, x, level, left, right, maxiter, trail=''):
+        n = len(x)
+        if level <= 0 and n:
+            s = '...'
+        else:
+            pieces = self._pieces(x, n, maxiter, lambda item: self.repr1(item, level - 1))
+            s = ', '.join(pieces)
+            if n == 1 and trail:
+                right = trail + right
+        return left + s + right
+
+    def repr_set(self, x, level):
+        if not x:
+            return 'set()'
+        return self._repr_iterable(x, level, '{', '}', self.maxset)
+
+    def repr_frozenset(self, x, level):
+        if not x:
+            return 'frozenset()'
+        return self._repr_iterable(x, level, 'frozenset({', '})', self.maxfrozenset)
+
+    def repr_dict(self, x, level):
+        if not x:
+            return '{}'
+        if level <= 0:
+            return '{...}'
+        repr1 = self.repr1
+        pieces = self._pieces(
+            x.items(), len(x), self.maxdict,
+            lambda item: '{}: {}'.format(repr1(item[0], level - 1), repr1(item[1], level - 1)),
+        )
+        return '{' + ', '.join(pieces) + '}'
+
+
+def truncated_repr(value) -> str:
+    """
+    The repr of value with at most 10 items per container, 20 levels of nesting,
+    100 values in total, and 200 characters per string, number or other object.
+    This bounds the cost of formatting huge values, e.g. a dict with millions of items.
+    """
+    # A new instance each time since it counts the values it has formatted
+    return _VariableRepr().repr(value)
+
+
 def unique_in_order(it: Iterable[T]) -> List[T]:
     return list(OrderedDict.fromkeys(it))
 
@@ -43,25 +123,27 @@ def line_range(atok: ASTText, node: ast.AST) -> Tuple[int, int]:
 
 def highlight_unique(lst: List[T]) -> Iterator[Tuple[T, bool]]:
     counts = Counter(lst)
+    common = {x for x, count in counts.items() if count > 3}
 
-    for is_common, group in itertools.groupby(lst, key=lambda x: counts[x] > 3):
+    for is_common, group in itertools.groupby(lst, key=common.__contains__):
         if is_common:
             group = list(group)
             highlighted = [False] * len(group)
 
-            def highlight_index(f):
-                try:
-                    i = f()
-                except ValueError:
-                    return None
-                highlighted[i] = True
-                return i
-
-            for item in set(group):
-                first = highlight_index(lambda: group.index(item))
-                if first is not None:
-                    highlight_index(lambda: group.index(item, first + 1))
-                highlight_index(lambda: -1 - group[::-1].index(item))
+            # Highlight the first, second and last occurrence of each item
+            first = {}
+            second = {}
+            last = {}
+            for i, item in enumerate(group):
+                last[item] = i
+                if item not in first:
+                    first[item] = i
+                elif item not in second:
+                    second[item] = i
+
+            for indices in (first, second, last):
+                for i in indices.values():
+                    highlighted[i] = True
         else:
             highlighted = itertools.repeat(True)
 
@@ -74,16 +156,21 @@ def identity(x: T) -> T:
 
 def collapse_repeated(lst, *, collapser, mapper=identity, key=identity):
     keyed = list(map(key, lst))
+    highlighted = map(itemgetter(1), highlight_unique(keyed))
     for is_highlighted, group in itertools.groupby(
-            zip(lst, highlight_unique(keyed)),
-            key=lambda t: t[1][1],
+            zip(lst, keyed, highlighted),
+            key=itemgetter(2),
     ):
-        original_group, highlighted_group = zip(*group)
         if is_highlighted:
-            yield from map(mapper, original_group)
+            for original, _, _ in group:
+                yield mapper(original)
         else:
-            keyed_group, _ = zip(*highlighted_group)
-            yield collapser(list(original_group), list(keyed_group))
+            original_group = []
+            keyed_group = []
+            for original, keyed_item, _ in group:
+                original_group.append(original)
+                keyed_group.append(keyed_item)
+            yield collapser(original_group, keyed_group)
 
 
 def is_frame(frame_or_tb: Union[FrameType, TracebackType]) -> bool:
@@ -92,12 +179,18 @@ def is_frame(frame_or_tb: Union[FrameType, TracebackType]) -> bool:
 
 
 def iter_stack(frame_or_tb: Union[FrameType, TracebackType]) -> Iterator[Union[FrameType, TracebackType]]:
+    if not frame_or_tb:
+        return
+
+    # The whole chain is the same type, so only check it once
+    if is_frame(frame_or_tb):
+        next_attr = "f_back"
+    else:
+        next_attr = "tb_next"
+
     while frame_or_tb:
         yield frame_or_tb
-        if is_frame(frame_or_tb):
-            frame_or_tb = frame_or_tb.f_back
-        else:
-            frame_or_tb = frame_or_tb.tb_next
+        frame_or_tb = getattr(frame_or_tb, next_attr)
 
 
 def frame_and_lineno(frame_or_tb: Union[FrameType, TracebackType]) -> Tuple[FrameType, int]:
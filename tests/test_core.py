@@ -480,6 +480,23 @@ def test_skipping_frames():
     check_skipping_frames(False)
 
 
+def test_scope_pieces_shared_between_frames():
+    def get_frame_info():
+        return FrameInfo(inspect.currentframe())
+
+    frame_info1 = get_frame_info()
+    frame_info2 = get_frame_info()
+    assert frame_info1.frame is not frame_info2.frame
+    assert frame_info1.scope is frame_info2.scope
+    assert frame_info1.scope_pieces is frame_info2.scope_pieces
+    scope_start, scope_end = frame_info1.source.line_range(frame_info1.scope)
+    assert frame_info1.scope_pieces == [
+        piece
+        for piece in frame_info1.source.pieces
+        if scope_start <= piece.start and piece.stop <= scope_end
+    ]
+
+
 def sys_modules_sources():
     for module in list(sys.modules.values()):
         try:
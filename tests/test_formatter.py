@@ -1,12 +1,15 @@
+import inspect
 import os
 import re
 import sys
+import traceback
 from contextlib import contextmanager
 
 import pytest
 import pygments
 
-from stack_data import Formatter, FrameInfo, Options, BlankLines
+from stack_data import Formatter, FrameInfo, Options, BlankLines, Line
+from stack_data.utils import iter_stack
 from tests.utils import compare_to_file
 
 
@@ -166,3 +169,141 @@ def test_invalid_single_option():
     with pytest.raises(ValueError):
         MyFormatter(show_linenos=False, options=Options(blank_lines=BlankLines.SINGLE))
 
+
+def test_exception_chain_cycle():
+    try:
+        try:
+            raise ValueError("first")
+        except ValueError as e1:
+            raise TypeError("second") from e1
+    except TypeError as e:
+        e.__cause__.__context__ = e
+        lines = list(Formatter().format_exception(e))
+
+    text = "".join(lines)
+    assert text.count("Traceback (most recent call last):") == 2
+    assert text.index("ValueError: first") < text.index("TypeError: second")
+
+
+def test_long_exception_chain():
+    length = 300
+    e = first = None
+    for i in range(length):
+        try:
+            raise ValueError(i) from e
+        except ValueError as new_e:
+            e = new_e
+            first = first or e
+
+    formatter = Formatter()
+    # Parse this file before lowering the recursion limit
+    "".join(formatter.format_exception(first))
+
+    # Make the chain longer than the recursion limit allows for,
+    # without needing thousands of links which make the test slow.
+    recursion_limit = sys.getrecursionlimit()
+    depth = len(list(iter_stack(inspect.currentframe())))
+    sys.setrecursionlimit(depth + length // 2)
+    try:
+        text = "".join(formatter.format_exception(e))
+    finally:
+        sys.setrecursionlimit(recursion_limit)
+
+    assert text.count("Traceback (most recent call last):") == length
+    assert text.count(traceback._cause_message) == length - 1
+    positions = [text.index("ValueError: {}\n".format(i)) for i in range(length)]
+    assert positions == sorted(positions)
+
+
+def test_line_prefix_attributes_can_be_changed():
+    frame_info = FrameInfo(inspect.currentframe())
+    [line] = [
+        line
+        for line in frame_info.lines
+        if isinstance(line, Line) and line.is_current
+    ]
+
+    formatter = Formatter()
+    assert formatter.format_line(line).startswith("-->")
+
+    formatter.current_line_indicator = "==>"
+    formatter.line_number_format_string = "{:5}: "
+    assert re.match(r"==> +\d+: +frame_info = ", formatter.format_line(line))
+
+    formatter.current_line_indicator = None
+    assert re.match(r" {3} +\d+: +frame_info = ", formatter.format_line(line))
+
+
+def test_print_exception_write_only_file():
+    class WriteOnly:
+        def __init__(self):
+            self.written = []
+
+        def write(self, text):
+            self.written.append(text)
+
+    file = WriteOnly()
+    try:
+        1 / 0
+    except ZeroDivisionError as e:
+        Formatter().print_exception(e, file=file)
+
+    text = "".join(file.written)
+    assert text.startswith("Traceback (most recent call last):\n")
+    assert text.endswith("ZeroDivisionError: division by zero\n")
+
+
+def test_print_lines_batches_writes():
+    class WriteOnly:
+        def __init__(self):
+            self.written = []
+
+        def write(self, text):
+            self.written.append(text)
+
+    def lines():
+        for i in range(100):
+            yield "{}\n".format(i)
+        raise ValueError
+
+    file = WriteOnly()
+    with pytest.raises(ValueError):
+        Formatter().print_lines(lines(), file=file)
+
+    # Everything produced before the error is still written
+    assert "".join(file.written) == "".join("{}\n".format(i) for i in range(100))
+    assert len(file.written) == 2
+
+
+def test_print_lines_without_stderr(monkeypatch, capsys):
+    monkeypatch.setattr(sys, "stderr", None)
+    Formatter().print_lines(["foo\n"])
+    assert capsys.readouterr().out == "foo\n"
+
+    monkeypatch.setattr(sys, "stdout", None)
+    Formatter().print_lines(["foo\n"])
+
+
+def test_format_variable_value_truncated():
+    formatter = Formatter()
+    assert formatter.format_variable_value([1, 2]) == "[1, 2]"
+    assert formatter.format_variable_value(list(range(100))) == "[0, 1, 2, 3, 4, 5, 6, 7, 8, 9, ...]"
+    assert len(formatter.format_variable_value("x" * 10000)) <= 200
+    assert formatter.format_variable_value({'b': 1, 'a': 2}) == "{'b': 1, 'a': 2}"
+    assert formatter.format_variable_value({3, 1, 2}) == repr({3, 1, 2})
+    assert formatter.format_variable_value(2 ** 200) == str(2 ** 200)
+    assert formatter.format_variable_value([[[[[[[[1]]]]]]]]) == "[[[[[[[[1]]]]]]]]"
+    assert formatter.format_variable_value(dict.fromkeys(range(20))).endswith(", 9: None, ...}")
+
+    nested = list(range(10))
+    for _ in range(5):
+        nested = {i: nested for i in range(10)}
+    result = formatter.format_variable_value(nested)
+    assert result.startswith("{0: {0: {0: {0: {0: [0, 1, 2, 3, 4, 5, 6, 7, 8, 9], 1: [")
+    assert result.count("...") > 0
+    assert len(result) < 1000
+
+    shared = []
+    for _ in range(100):
+        shared = [shared] * 10
+    assert len(formatter.format_variable_value(shared)) < 1000
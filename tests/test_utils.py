@@ -2,7 +2,7 @@ import random
 from collections import Counter
 
 from stack_data import FrameInfo
-from stack_data.utils import highlight_unique, collapse_repeated, cached_property
+from stack_data.utils import highlight_unique, collapse_repeated, cached_property, truncate
 
 
 def assert_collapsed(lst, expected, summary):
@@ -43,6 +43,15 @@ def test_highlight_unique_properties():
         assert set(highlighted) == {True, False}
 
 
+def test_truncate():
+    lst = list(range(10))
+    assert truncate(lst, 10, ['...']) == lst
+    assert truncate(lst, 5, ['...']) == [0, 1, '...', 8, 9]
+    assert truncate(lst, 4, ['...']) == [0, 1, '...', 9]
+    assert truncate(lst, 2, ['...']) == [0, '...']
+    assert lst == list(range(10))
+
+
 def test_cached_property_from_class():
     assert FrameInfo.filename is FrameInfo.__dict__["filename"]
     assert isinstance(FrameInfo.filename, cached_property)